@@ -1,49 +1,123 @@
-import pandas as pd
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from typing import Dict, List, Optional, Tuple
-import io
+import numpy as np
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import os
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import openpyxl
 from openpyxl.utils import get_column_letter
-import xlrd
-from pydantic import BaseModel
+from python_calamine import CalamineWorkbook
+from dataclasses import dataclass
 import hashlib
-from fastapi.responses import JSONResponse
+import zlib
+import datetime
+import diskcache
+from pydantic import BaseModel
 
 app = FastAPI()
 
 # ========== DATA MODELS ==========
-class TableRow(BaseModel):
-    name: str
-    values: List[Optional[float]]
-    location: str
-
-class TableData(BaseModel):
+@dataclass(slots=True)
+class TableData:
     name: str
     sheet: str
     start_row: int
     end_row: int
     start_col: str
     end_col: str
-    rows: Dict[str, TableRow]  # row_name: TableRow
+    row_names: List[str]
+    row_numbers: List[int]  # sheet row number of each data row
+    values: np.ndarray  # rows x value columns, float64 with NaN for missing
+    row_sums: Dict[str, Optional[float]]  # row_name: value served by /row_value
 
-class UploadedFile(BaseModel):
+@dataclass(slots=True)
+class UploadedFile:
     filename: str
     content_hash: str
     sheets: List[str]
     tables: Dict[str, TableData]  # table_name: TableData
 
+# ========== RESPONSE MODELS ==========
+# Declared so FastAPI serializes responses straight to JSON via Pydantic
+class UploadResponse(BaseModel):
+    file_id: str
+    filename: Optional[str] = None
+    sheets: Optional[List[str]] = None
+    tables: List[str]
+    message: str
+
+class TableSummary(BaseModel):
+    name: str
+    sheet: str
+    location: str
+    row_count: int
+
+class TableList(BaseModel):
+    tables: List[TableSummary]
+
+class TableDetails(BaseModel):
+    table_name: str
+    sheet: str
+    row_names: List[str]
+    location: str
+
+class RowValue(BaseModel):
+    table_name: str
+    row_name: str
+    value: Optional[float]
+    sheet: str
+    location: str
+
 # ========== GLOBAL STORE ==========
-file_store: Dict[str, UploadedFile] = {}
+# Keyed by content hash, every entry tagged with its file_id:
+#   file_id                        -> file metadata with table summaries
+#   (file_id, table_name)          -> /get_table_details payload
+#   (file_id, table_name, "rows", chunk) -> {row_name: (value, location)} for
+#       /row_value, rows spread over row_chunk_count() chunks by row_chunk()
+# Shared by all uvicorn workers. Bump STORE_FORMAT_VERSION whenever the
+# stored layout changes so old entries are never read back.
+STORE_FORMAT_VERSION = 3
+CACHE_DIR = os.path.join(
+    os.environ.get("EXCEL_CACHE_DIR", "/var/tmp/excel_cache"), f"v{STORE_FORMAT_VERSION}"
+)
+file_store = diskcache.Cache(CACHE_DIR, size_limit=int(8e9), tag_index=True)
+
+# Worker threads for workbook parsing
+parse_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Worker processes for scanning the sheets of large multi-sheet workbooks.
+# Processes are only started on first use; spawn avoids forking the
+# threaded server process.
+def new_sheet_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+sheet_pool = new_sheet_pool()
+sheet_pool_lock = threading.Lock()
+PROCESS_POOL_MIN_CELLS = 50_000
+
+# Rows per stored /row_value chunk; small enough to unpickle per request
+ROWS_PER_CHUNK = 1024
 
 # ========== UTILITIES ==========
-def get_file_hash(content: bytes) -> str:
-    return hashlib.sha256(content).hexdigest()
+HASH_CHUNK_SIZE = 1 << 20
+
+def get_file_hash(stream) -> str:
+    # 128-bit BLAKE2b is plenty for content dedup and cheaper than SHA-256
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        h.update(chunk)
+    return h.hexdigest()
+
+_STRIP_NUMBER_CHARS = str.maketrans('', '', '$, ')
 
 def convert_to_float(value) -> Optional[float]:
+    if type(value) in (int, float):
+        return float(value)
     if value is None:
         return None
-    if isinstance(value, (int, float)):
-        return float(value)
     if isinstance(value, str):
         value = value.strip()
         if '%' in value:
@@ -51,342 +125,365 @@ def convert_to_float(value) -> Optional[float]:
                 return float(value.replace('%', '')) / 100
             except ValueError:
                 return None
-        if '$' in value:
-            try:
-                return float(value.replace('$', '').replace(',', ''))
-            except ValueError:
-                return None
         try:
-            return float(value)
+            return float(value.translate(_STRIP_NUMBER_CHARS))
         except ValueError:
             return None
+    if isinstance(value, (int, float)):
+        return float(value)
     return None
 
+def table_location(table: TableData) -> str:
+    return f"{table.start_col}{table.start_row}:{table.end_col}{table.end_row}"
+
+def store_uploaded_file(uploaded_file: UploadedFile) -> dict:
+    """Persist a parsed file as a metadata entry plus two entries per table"""
+    file_id = uploaded_file.content_hash
+    meta = {
+        "filename": uploaded_file.filename,
+        "sheets": uploaded_file.sheets,
+        "tables": [
+            {
+                "name": table.name,
+                "sheet": table.sheet,
+                "location": table_location(table),
+                "row_count": len(table.row_names)
+            }
+            for table in uploaded_file.tables.values()
+        ]
+    }
+    # Culling drops the oldest stored entries first, so writing the metadata
+    # first means a partly evicted file loses its file_id entry before any
+    # of its tables. The read endpoints still treat a missing entry of a
+    # listed table as an evicted file.
+    with file_store.transact():
+        file_store.set(file_id, meta, tag=file_id)
+        for table_name, table in uploaded_file.tables.items():
+            file_store.set((file_id, table_name), {
+                "table_name": table.name,
+                "sheet": table.sheet,
+                "row_names": table.row_names,
+                "location": table_location(table)
+            }, tag=file_id)
+            chunks = [{} for _ in range(row_chunk_count(len(table.row_names)))]
+            for row_name, row_number in zip(table.row_names, table.row_numbers):
+                chunks[row_chunk(row_name, len(chunks))][row_name] = (
+                    table.row_sums[row_name], f"{table.start_col}{row_number}"
+                )
+            for chunk, rows in enumerate(chunks):
+                file_store.set((file_id, table_name, "rows", chunk), rows, tag=file_id)
+    return meta
+
+def row_chunk_count(row_count: int) -> int:
+    return max(1, -(-row_count // ROWS_PER_CHUNK))
+
+def row_chunk(row_name: str, chunk_count: int) -> int:
+    # crc32 rather than hash(), which is salted per process
+    return zlib.crc32(row_name.encode()) % chunk_count
+
+def find_table(meta: dict, table_name: str) -> Optional[dict]:
+    """Return a table's summary from file metadata, if the file has it"""
+    return next((table for table in meta["tables"] if table["name"] == table_name), None)
+
+async def run_in_thread(func, *args):
+    """Run blocking cache I/O on the default executor, away from the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+async def raise_evicted_file(file_id: str):
+    """Drop what is left of a partly evicted file and report it as missing"""
+    await run_in_thread(file_store.evict, file_id)
+    raise HTTPException(status_code=404, detail="File not found, please upload it again")
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    # file_id is the content hash, so a given URL's response never changes
+    return {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check a request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
 # ========== EXCEL PROCESSORS ==========
-async def process_xlsx_file(content: bytes, filename: str) -> UploadedFile:
-    wb = openpyxl.load_workbook(io.BytesIO(content), data_only=True)
+def process_xlsx_file(stream: BinaryIO, filename: str, content_hash: str) -> UploadedFile:
+    wb = openpyxl.load_workbook(stream, data_only=True, read_only=True)
     sheets = wb.sheetnames
-    tables = {}
 
-    for sheet_name in sheets:
-        sheet = wb[sheet_name]
-        
-        # Scan for tables with ALL CAPS headers
-        for row in sheet.iter_rows():
-            for cell in row:
-                if (cell.value and isinstance(cell.value, str) and 
-                    cell.value.isupper() and cell.value.strip() == cell.value):
-                    
-                    # Verify it's a valid table header
-                    if not is_valid_table_header(sheet, cell):
-                        continue
-                    
-                    table_name = cell.value.strip()
-                    start_row = cell.row
-                    start_col = cell.column
-                    
-                    # Find table boundaries
-                    data_start_row, end_row, end_col = find_table_boundaries(sheet, start_row, start_col)
-                    if not data_start_row:
-                        continue
-                    
-                    # Extract all row data
-                    rows = {}
-                    for row_idx in range(data_start_row, end_row + 1):
-                        row_cells = [
-                            sheet.cell(row=row_idx, column=col_idx).value 
-                            for col_idx in range(start_col, end_col + 1)
-                        ]
-                        if not row_cells or not row_cells[0]:
-                            continue
-                            
-                        row_name = str(row_cells[0]).strip()
-                        values = [convert_to_float(v) for v in row_cells[1:]]
-                        location = f"{get_column_letter(start_col)}{row_idx}"
-                        
-                        rows[row_name] = TableRow(
-                            name=row_name,
-                            values=values,
-                            location=location
-                        )
-                    
-                    if rows:
-                        tables[table_name] = TableData(
-                            name=table_name,
-                            sheet=sheet_name,
-                            start_row=data_start_row,
-                            end_row=end_row,
-                            start_col=get_column_letter(start_col),
-                            end_col=get_column_letter(end_col),
-                            rows=rows
-                        )
+    sheet_grids = [(sheet_name, read_xlsx_grid(wb[sheet_name])) for sheet_name in sheets]
+    wb.close()
+    tables = scan_sheets(sheet_grids)
     
     return UploadedFile(
         filename=filename,
-        content_hash=get_file_hash(content),
+        content_hash=content_hash,
         sheets=sheets,
         tables=tables
     )
 
-async def process_xls_file(content: bytes, filename: str) -> UploadedFile:
-    file_like = io.BytesIO(content)
-    wb = xlrd.open_workbook(file_contents=content)
-    sheets = wb.sheet_names()
-    tables = {}
+def process_xls_file(stream: BinaryIO, filename: str, content_hash: str) -> UploadedFile:
+    wb = CalamineWorkbook.from_filelike(stream)
+    sheets = wb.sheet_names
 
-    for sheet_name in sheets:
-        sheet = wb.sheet_by_name(sheet_name)
-        
-        for row_idx in range(sheet.nrows):
-            for col_idx in range(sheet.ncols):
-                cell = sheet.cell(row_idx, col_idx)
-                if (cell.value and isinstance(cell.value, str) and 
-                    cell.value.isupper() and cell.value.strip() == cell.value):
-                    
-                    # Verify it's a valid table header
-                    if not is_valid_xls_table_header(sheet, row_idx, col_idx):
-                        continue
-                    
-                    table_name = cell.value.strip()
-                    start_row = row_idx
-                    start_col = col_idx
-                    
-                    # Find table boundaries
-                    data_start_row, end_row, end_col = find_xls_table_boundaries(sheet, start_row, start_col)
-                    if not data_start_row:
-                        continue
-                    
-                    # Extract all row data
-                    rows = {}
-                    for data_row_idx in range(data_start_row, end_row + 1):
-                        row_cells = [
-                            sheet.cell_value(data_row_idx, c) 
-                            for c in range(start_col, end_col + 1)
-                        ]
-                        if not row_cells or not row_cells[0]:
-                            continue
-                            
-                        row_name = str(row_cells[0]).strip()
-                        values = [convert_to_float(v) for v in row_cells[1:]]
-                        location = f"{get_column_letter(start_col + 1)}{data_row_idx + 1}"
-                        
-                        rows[row_name] = TableRow(
-                            name=row_name,
-                            values=values,
-                            location=location
-                        )
-                    
-                    if rows:
-                        tables[table_name] = TableData(
-                            name=table_name,
-                            sheet=sheet_name,
-                            start_row=data_start_row + 1,
-                            end_row=end_row + 1,
-                            start_col=get_column_letter(start_col + 1),
-                            end_col=get_column_letter(end_col + 1),
-                            rows=rows
-                        )
+    sheet_grids = [(sheet_name, read_xls_grid(wb.get_sheet_by_name(sheet_name))) for sheet_name in sheets]
+    tables = scan_sheets(sheet_grids)
     
     return UploadedFile(
         filename=filename,
-        content_hash=get_file_hash(content),
+        content_hash=content_hash,
         sheets=sheets,
         tables=tables
     )
 
-# ========== TABLE DETECTION HELPERS ==========
-def is_valid_table_header(sheet, cell) -> bool:
-    """Check if a cell is a valid table header in xlsx"""
-    if cell.column > 1 and sheet.cell(row=cell.row, column=cell.column-1).value:
-        return False
-    
-    empty_adjacent = 0
-    for col in range(cell.column + 1, min(cell.column + 4, sheet.max_column + 1)):
-        if not sheet.cell(row=cell.row, column=col).value:
-            empty_adjacent += 1
-        else:
-            break
-    
-    if empty_adjacent < 2:
-        return False
+def scan_sheets(sheet_grids: List[Tuple[str, list]]) -> Dict[str, TableData]:
+    """Scan materialized sheets, fanning large multi-sheet workbooks out to processes"""
+    global sheet_pool
+    # Grids can be ragged (xlsx rows stop at their last cell), so count cells
+    n_cells = sum(len(row) for _, grid in sheet_grids for row in grid)
+    results = None
+    if len(sheet_grids) > 1 and n_cells >= PROCESS_POOL_MIN_CELLS:
+        pool = sheet_pool
+        try:
+            results = list(pool.map(_scan_sheet, sheet_grids))
+        except BrokenProcessPool:
+            # A dead worker breaks the pool for good; replace it for later
+            # uploads and scan this workbook in-thread instead
+            with sheet_pool_lock:
+                if sheet_pool is pool:
+                    sheet_pool = new_sheet_pool()
+            pool.shutdown(wait=False)
+    if results is None:
+        results = map(_scan_sheet, sheet_grids)
+
+    tables = {}
+    for sheet_tables in results:
+        tables.update(sheet_tables)
+    return tables
+
+def _scan_sheet(sheet_grid: Tuple[str, list]) -> Dict[str, TableData]:
+    sheet_name, grid = sheet_grid
+    return scan_sheet_tables(grid, sheet_name)
+
+def scan_sheet_tables(grid, sheet_name: str) -> Dict[str, TableData]:
+    """Extract all ALL CAPS headed tables from a materialized sheet grid"""
+    tables = {}
+    # Sheet dimensions are read once and passed down to the helpers
+    n_rows = len(grid)
+    n_cols = max((len(row) for row in grid), default=0)
+    for row in grid:
+        if len(row) < n_cols:
+            row.extend([None] * (n_cols - len(row)))
+
+    candidates = {}  # row_idx: columns holding ALL CAPS text
+    for row_idx, col_idx in find_header_candidates(grid):
+        candidates.setdefault(row_idx, []).append(col_idx)
+
+    # Single pass over the rows. Headers stay open while their data region
+    # is read and are closed at the next empty row, the next header row or
+    # the end of the sheet.
+    open_headers = []  # (start_col, table_name)
+    data_start_row = None
+    next_has_data = n_rows > 0 and any(grid[0])
+    for row_idx, row in enumerate(grid):
+        has_data = next_has_data
+        next_has_data = row_idx + 1 < n_rows and any(grid[row_idx + 1])
+
+        headers = [
+            (col_idx, row[col_idx].strip())
+            for col_idx in candidates.get(row_idx, ())
+            if is_valid_table_header(row, col_idx, n_cols, next_has_data)
+        ]
+
+        if open_headers and has_data and data_start_row is None and not headers:
+            data_start_row = row_idx
+        elif open_headers and has_data and headers:
+            # A header row ends the data region; when it comes straight
+            # after the header gap the open tables have no rows at all
+            if data_start_row is not None:
+                close_tables(tables, grid, sheet_name, open_headers, data_start_row, row_idx - 1, n_cols)
+            open_headers, data_start_row = [], None
+        elif open_headers and not has_data and data_start_row is not None:
+            close_tables(tables, grid, sheet_name, open_headers, data_start_row, row_idx - 1, n_cols)
+            open_headers, data_start_row = [], None
+
+        if headers:
+            open_headers = headers
+
+    if open_headers and data_start_row is not None:
+        close_tables(tables, grid, sheet_name, open_headers, data_start_row, n_rows - 1, n_cols)
     
-    if cell.row + 1 > sheet.max_row:
-        return False
+    return tables
+
+def close_tables(tables, grid, sheet_name, headers, data_start_row, end_row, n_cols):
+    """Build TableData for headers sharing the data rows data_start_row..end_row"""
+    # Which columns hold any data in the region, computed once for all headers
+    cols_used = [any(col) for col in zip(*grid[data_start_row:end_row + 1])]
+    for start_col, table_name in headers:
+        end_col = find_table_end_col(cols_used, start_col, n_cols)
         
-    next_row_has_data = False
-    for col in range(1, sheet.max_column + 1):
-        if sheet.cell(row=cell.row + 1, column=col).value:
-            next_row_has_data = True
-            break
-    
-    return next_row_has_data
+        # Extract all row data
+        rows = {}  # row_name: (sheet row number, cell values)
+        for data_row_idx in range(data_start_row, end_row + 1):
+            row_cells = grid[data_row_idx][start_col:end_col + 1]
+            if not row_cells or not row_cells[0]:
+                continue
+                
+            row_name = str(row_cells[0]).strip()
+            rows[row_name] = (data_row_idx + 1, row_cells[1:])
+        
+        if rows:
+            row_names = list(rows)
+            values = convert_block_to_floats(
+                [v for _, cells in rows.values() for v in cells],
+                len(rows), end_col - start_col
+            )
+            tables[table_name] = TableData(
+                name=table_name,
+                sheet=sheet_name,
+                start_row=data_start_row + 1,
+                end_row=end_row + 1,
+                start_col=get_column_letter(start_col + 1),
+                end_col=get_column_letter(end_col + 1),
+                row_names=row_names,
+                row_numbers=[row_number for row_number, _ in rows.values()],
+                values=values,
+                row_sums=compute_row_sums(row_names, values)
+            )
+
+def convert_block_to_floats(cells: list, n_rows: int, n_cols: int) -> np.ndarray:
+    """Convert row-major table cells to a float64 matrix with NaN for missing"""
+    flat = []
+    for v in cells:
+        v = convert_to_float(v)
+        flat.append(np.nan if v is None else v)
+    return np.array(flat, dtype=np.float64).reshape(n_rows, n_cols)
+
+def compute_row_sums(row_names: List[str], values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Precompute the /row_value result for every row of a table"""
+    if values.shape[1] == 0:
+        sums = [None] * len(row_names)
+    elif values.shape[1] == 1:
+        # For single value rows, use the value itself
+        sums = [None if np.isnan(v) else v for v in values[:, 0].tolist()]
+    else:
+        # For multiple values, sum ignoring missing values
+        sums = np.nansum(values, axis=1).tolist()
+    return dict(zip(row_names, sums))
+
+# ========== TABLE DETECTION HELPERS ==========
+def read_xlsx_grid(sheet) -> List[list]:
+    """Materialize a read-only xlsx sheet into a list of rows"""
+    # Stored dimensions can be missing or stale, so size the grid from the cells
+    sheet.reset_dimensions()
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+def xls_cell_value(value):
+    """Map a calamine cell value to what xlrd's cell_value returned"""
+    # xlrd gave floats for numbers, 1/0 for booleans and date serial numbers
+    # for dates; row labels and values keep their pre-calamine form
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return (value - EXCEL_EPOCH).total_seconds() / 86400
+    if isinstance(value, datetime.date):
+        return float((value - EXCEL_EPOCH.date()).days)
+    if isinstance(value, datetime.time):
+        return (value.hour * 3600 + value.minute * 60 + value.second +
+                value.microsecond / 1e6) / 86400
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds() / 86400
+    return value
 
-def is_valid_xls_table_header(sheet, row_idx, col_idx) -> bool:
-    """Check if a cell is a valid table header in xls"""
-    if col_idx > 0 and sheet.cell_value(row_idx, col_idx-1):
+def read_xls_grid(sheet) -> List[list]:
+    """Materialize a calamine sheet into a list of rows with xlrd-style values"""
+    # Keep leading empty rows/columns so grid indices match sheet positions
+    return [
+        [v if type(v) is float or type(v) is str else xls_cell_value(v) for v in row]
+        for row in sheet.to_python(skip_empty_area=False)
+    ]
+
+def is_header_text(value) -> bool:
+    """Check if a cell value looks like an ALL CAPS table title"""
+    # isupper() is False for empty text; checking the two ends for whitespace
+    # matches strip() == value without building a stripped copy
+    return (isinstance(value, str) and value.isupper() and
+            not value[0].isspace() and not value[-1].isspace())
+
+def find_header_candidates(grid) -> List[Tuple[int, int]]:
+    """Locate ALL CAPS text cells"""
+    return [
+        (row_idx, col_idx)
+        for row_idx, row in enumerate(grid)
+        for col_idx, value in enumerate(row)
+        if is_header_text(value)
+    ]
+
+def is_valid_table_header(row, col_idx, n_cols, next_row_has_data) -> bool:
+    """Check if a cell is a valid table header"""
+    if col_idx > 0 and row[col_idx-1]:
         return False
     
     empty_adjacent = 0
-    for c in range(col_idx + 1, min(col_idx + 4, sheet.ncols)):
-        if not sheet.cell_value(row_idx, c):
+    for c in range(col_idx + 1, min(col_idx + 4, n_cols)):
+        if not row[c]:
             empty_adjacent += 1
         else:
             break
     
     if empty_adjacent < 2:
         return False
-    
-    if row_idx + 1 >= sheet.nrows:
-        return False
         
-    next_row_has_data = False
-    for c in range(sheet.ncols):
-        if sheet.cell_value(row_idx + 1, c):
-            next_row_has_data = True
-            break
-    
     return next_row_has_data
 
-def find_table_boundaries(sheet, start_row, start_col) -> Tuple[int, int, int]:
-    """Find table boundaries in xlsx"""
-    data_start_row = start_row + 1
-    while data_start_row <= sheet.max_row:
-        next_row_empty = True
-        for col in range(1, sheet.max_column + 1):
-            if sheet.cell(row=data_start_row, column=col).value:
-                next_row_empty = False
-                break
-        if not next_row_empty:
-            break
-        data_start_row += 1
-    
-    if data_start_row > sheet.max_row:
-        return (None, None, None)
-    
-    end_row = data_start_row
-    while end_row <= sheet.max_row:
-        has_header = False
-        for col in range(1, sheet.max_column + 1):
-            cell_val = sheet.cell(row=end_row, column=col).value
-            if (cell_val and isinstance(cell_val, str) and 
-                cell_val.isupper() and cell_val.strip() == cell_val and
-                is_valid_table_header(sheet, sheet.cell(row=end_row, column=col))):
-                has_header = True
-                break
-        if has_header:
-            break
-        
-        row_empty = True
-        for col in range(1, sheet.max_column + 1):
-            if sheet.cell(row=end_row, column=col).value:
-                row_empty = False
-                break
-        if row_empty:
-            break
-        
-        end_row += 1
-    
-    end_row = min(end_row - 1, sheet.max_row)
-    
-    end_col = start_col
-    for col in range(start_col, sheet.max_column + 1):
-        col_has_data = False
-        for row_num in range(data_start_row, end_row + 1):
-            if sheet.cell(row=row_num, column=col).value:
-                col_has_data = True
-                break
-        if not col_has_data:
-            break
-        end_col = col
-    
-    return (data_start_row, end_row, end_col)
-
-def find_xls_table_boundaries(sheet, start_row, start_col) -> Tuple[int, int, int]:
-    """Find table boundaries in xls"""
-    data_start_row = start_row + 1
-    while data_start_row < sheet.nrows:
-        next_row_empty = True
-        for c in range(sheet.ncols):
-            if sheet.cell_value(data_start_row, c):
-                next_row_empty = False
-                break
-        if not next_row_empty:
-            break
-        data_start_row += 1
-    
-    if data_start_row >= sheet.nrows:
-        return (None, None, None)
-    
-    end_row = data_start_row
-    while end_row < sheet.nrows:
-        has_header = False
-        for c in range(sheet.ncols):
-            cell_val = sheet.cell_value(end_row, c)
-            if (cell_val and isinstance(cell_val, str) and 
-                cell_val.isupper() and cell_val.strip() == cell_val and
-                is_valid_xls_table_header(sheet, end_row, c)):
-                has_header = True
-                break
-        if has_header:
-            break
-        
-        row_empty = True
-        for c in range(sheet.ncols):
-            if sheet.cell_value(end_row, c):
-                row_empty = False
-                break
-        if row_empty:
-            break
-        
-        end_row += 1
-    
-    end_row = min(end_row - 1, sheet.nrows - 1)
-    
+def find_table_end_col(cols_used, start_col, n_cols) -> int:
+    """Find the last column of a table's contiguous data columns"""
     end_col = start_col
-    for c in range(start_col, sheet.ncols):
-        col_has_data = False
-        for row_num in range(data_start_row, end_row + 1):
-            if sheet.cell_value(row_num, c):
-                col_has_data = True
-                break
-        if not col_has_data:
-            break
-        end_col = c
+    if not cols_used[start_col]:
+        return end_col
+    while end_col + 1 < n_cols and cols_used[end_col + 1]:
+        end_col += 1
     
-    return (data_start_row, end_row, end_col)
+    return end_col
 
 # ========== API ENDPOINTS ==========
-@app.post("/uploadfile/")
+@app.post("/uploadfile/", response_model=UploadResponse, response_model_exclude_unset=True)
 async def upload_file(file: UploadFile):
     try:
-        content = await file.read()
-        if not content:
+        # Hash straight from the spooled upload; the parser reads the same
+        # file object, so the payload is never copied into one bytes blob
+        loop = asyncio.get_running_loop()
+        await file.seek(0)
+        file_hash = await loop.run_in_executor(parse_executor, get_file_hash, file.file)
+        if not file.file.tell():
             raise HTTPException(status_code=400, detail="Empty file")
         
         if not file.filename.endswith(('.xls', '.xlsx')):
             raise HTTPException(status_code=400, detail="Only Excel files allowed")
         
-        file_hash = get_file_hash(content)
-        
-        if file_hash in file_store:
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "file_id": file_hash,
-                    "message": "File already processed",
-                    "tables": list(file_store[file_hash].tables.keys())
-                }
-            )
+        meta = await run_in_thread(file_store.get, file_hash)
+        if meta is not None:
+            return {
+                "file_id": file_hash,
+                "message": "File already processed",
+                "tables": [table["name"] for table in meta["tables"]]
+            }
         
         try:
-            if file.filename.endswith('.xlsx'):
-                uploaded_file = await process_xlsx_file(content, file.filename)
-            else:
-                uploaded_file = await process_xls_file(content, file.filename)
+            # Parsing is CPU-bound, keep it off the event loop
+            process = process_xlsx_file if file.filename.endswith('.xlsx') else process_xls_file
+            await file.seek(0)
+            uploaded_file = await loop.run_in_executor(
+                parse_executor, process, file.file, file.filename, file_hash
+            )
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
         
-        file_store[file_hash] = uploaded_file
+        await run_in_thread(store_uploaded_file, uploaded_file)
         
         return {
             "file_id": file_hash,
@@ -401,77 +498,64 @@ async def upload_file(file: UploadFile):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
-@app.get("/list_tables")
-async def list_tables(file_id: str):
-    if file_id not in file_store:
+@app.get("/list_tables", response_model=TableList)
+async def list_tables(file_id: str, request: Request, response: Response):
+    meta = await run_in_thread(file_store.get, file_id)
+    if meta is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    uploaded_file = file_store[file_id]
-    return {
-        "tables": [
-            {
-                "name": table.name,
-                "sheet": table.sheet,
-                "location": f"{table.start_col}{table.start_row}:{table.end_col}{table.end_row}",
-                "row_count": len(table.rows)
-            }
-            for table in uploaded_file.tables.values()
-        ]
-    }
+    etag = f'"{file_id}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    
+    response.headers.update(cache_headers(etag))
+    return {"tables": meta["tables"]}
 
-@app.get("/get_table_details")
-async def get_table_details(file_id: str, table_name: str):
-    if file_id not in file_store:
+@app.get("/get_table_details", response_model=TableDetails)
+async def get_table_details(file_id: str, table_name: str, request: Request, response: Response):
+    meta = await run_in_thread(file_store.get, file_id)
+    if meta is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    uploaded_file = file_store[file_id]
-    table = uploaded_file.tables.get(table_name)
-    
-    if not table:
+    if find_table(meta, table_name) is None:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    return {
-        "table_name": table.name,
-        "sheet": table.sheet,
-        "row_names": list(table.rows.keys()),
-        "location": f"{table.start_col}{table.start_row}:{table.end_col}{table.end_row}"
-    }
+    # Answer revalidation before loading the table entry itself
+    etag = f'"{file_id}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    
+    details = await run_in_thread(file_store.get, (file_id, table_name))
+    if details is None:
+        await raise_evicted_file(file_id)
+    
+    response.headers.update(cache_headers(etag))
+    return details
 
-@app.get("/row_value")
+@app.get("/row_value", response_model=RowValue)
 async def get_row_value(file_id: str, table_name: str, row_name: str):
-    if file_id not in file_store:
+    meta = await run_in_thread(file_store.get, file_id)
+    if meta is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    uploaded_file = file_store[file_id]
-    table = uploaded_file.tables.get(table_name)
-    
-    if not table:
+    table = find_table(meta, table_name)
+    if table is None:
         raise HTTPException(status_code=404, detail="Table not found")
     
-    row = table.rows.get(row_name)
-    if not row:
-        raise HTTPException(status_code=404, detail="Row not found")
+    chunk = row_chunk(row_name, row_chunk_count(table["row_count"]))
+    rows = await run_in_thread(file_store.get, (file_id, table_name, "rows", chunk))
+    if rows is None:
+        await raise_evicted_file(file_id)
     
-    if not row.values:
-        return {
-            "table_name": table_name,
-            "row_name": row_name,
-            "value": None,
-            "sheet": table.sheet,
-            "location": row.location
-        }
-    
-    # For single value rows, return the first value
-    if len(row.values) == 1:
-        value = row.values[0]
-    else:
-        # For multiple values, return the sum (ignoring None values)
-        value = sum(v for v in row.values if v is not None)
+    row = rows.get(row_name)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Row not found")
     
+    value, location = row
     return {
         "table_name": table_name,
         "row_name": row_name,
         "value": value,
-        "sheet": table.sheet,
-        "location": row.location
+        "sheet": table["sheet"],
+        "location": location
     }
\ No newline at end of file
@@ -0,0 +1,183 @@
+import datetime
+import io
+import itertools
+import os
+import random
+import tempfile
+
+import numpy as np
+import openpyxl
+from fastapi.testclient import TestClient
+from openpyxl.utils import column_index_from_string
+
+os.environ.setdefault("EXCEL_CACHE_DIR", tempfile.mkdtemp())
+
+import app
+
+
+def test_convert_block_to_floats_matches_convert_to_float():
+    cells = ["1.5", " $1,000 ", "50%", "n/a", "", None, 2, 3.25, True,
+             datetime.datetime(2020, 1, 1)]
+    values = app.convert_block_to_floats(cells, 2, 5)
+    assert values.shape == (2, 5)
+    expected = [app.convert_to_float(v) for v in cells]
+    expected = np.array([np.nan if v is None else v for v in expected]).reshape(2, 5)
+    np.testing.assert_array_equal(values, expected)
+
+def test_convert_to_float_text_forms():
+    assert app.convert_to_float(" 50% ") == 0.5
+    assert app.convert_to_float("%5") == 0.05
+    assert app.convert_to_float("$5%") is None
+    assert app.convert_to_float("$1,200.50") == 1200.5
+    assert app.convert_to_float("1,200") == 1200.0
+    assert app.convert_to_float("n/a") is None
+    assert app.convert_to_float(True) == 1.0
+
+# ---------- table detection ----------
+
+def baseline_scan(grid):
+    """The original sheet.cell-based table finder, ported to a padded grid"""
+    n_rows = len(grid)
+    n_cols = max((len(row) for row in grid), default=0)
+    cell = lambda r, c: grid[r][c] if c < len(grid[r]) else None
+
+    def is_caps(v):
+        return bool(v and isinstance(v, str) and v.isupper() and v.strip() == v)
+
+    def valid_header(r, c):
+        if c > 0 and cell(r, c - 1):
+            return False
+        empty_adjacent = 0
+        for col in range(c + 1, min(c + 4, n_cols)):
+            if not cell(r, col):
+                empty_adjacent += 1
+            else:
+                break
+        if empty_adjacent < 2 or r + 1 >= n_rows:
+            return False
+        return any(cell(r + 1, col) for col in range(n_cols))
+
+    def row_empty(r):
+        return not any(cell(r, col) for col in range(n_cols))
+
+    tables = {}
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if not (is_caps(cell(r, c)) and valid_header(r, c)):
+                continue
+            start = r + 1
+            while start < n_rows and row_empty(start):
+                start += 1
+            if start >= n_rows:
+                continue
+            end = start
+            while end < n_rows:
+                if any(is_caps(cell(end, col)) and valid_header(end, col) for col in range(n_cols)):
+                    break
+                if row_empty(end):
+                    break
+                end += 1
+            end -= 1
+            end_col = c
+            for col in range(c, n_cols):
+                if not any(cell(row, col) for row in range(start, end + 1)):
+                    break
+                end_col = col
+            if any(cell(row, c) for row in range(start, end + 1)):
+                tables[cell(r, c)] = (start + 1, end + 1, c, end_col)
+    return tables
+
+def test_table_extents_match_baseline_finder():
+    rng = random.Random(1)
+    pool = [None, None, None, None, "A", "B", "x", 1, 0, "CD"]
+    for _ in range(20000):
+        n_rows, n_cols = rng.randint(0, 8), rng.randint(1, 7)
+        # Ragged rows, as read_xlsx_grid produces
+        grid = [[rng.choice(pool) for _ in range(rng.randint(0, n_cols))] for _ in range(n_rows)]
+        expected = baseline_scan(grid)
+        tables = app.scan_sheet_tables([list(row) for row in grid], "S")
+        got = {
+            name: (t.start_row, t.end_row, column_index_from_string(t.start_col) - 1,
+                   column_index_from_string(t.end_col) - 1)
+            for name, t in tables.items()
+        }
+        assert got == expected, grid
+        assert list(got) == list(expected), grid
+
+def test_is_header_text_matches_isupper_strip():
+    chars = ["A", "a", "1", " ", "\t", "\x1c", "É", "é", "&", "ß"]
+    for n in range(5):
+        for combo in itertools.product(chars, repeat=n):
+            text = "".join(combo)
+            expected = bool(text and text.isupper() and text.strip() == text)
+            assert app.is_header_text(text) == expected, repr(text)
+    for value in (None, 0, 1.5, True):
+        assert not app.is_header_text(value)
+
+# ---------- HTTP endpoints ----------
+
+def upload_sample(client):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in (["REVENUE", None, None, None], ["a", 1, 2, None], ["b", "$3", None, None],
+                [], ["COSTS", None, None, None], ["x", "50%", 1, None]):
+        ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    response = client.post("/uploadfile/", files={"file": ("sample.xlsx", buf.getvalue())})
+    assert response.status_code == 200
+    return response.json()["file_id"]
+
+def test_conditional_get_returns_304():
+    client = TestClient(app.app)
+    file_id = upload_sample(client)
+    etag = f'"{file_id}"'
+
+    for path, params in (("/list_tables", {"file_id": file_id}),
+                         ("/get_table_details", {"file_id": file_id, "table_name": "REVENUE"})):
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        assert response.headers["etag"] == etag
+        assert "immutable" in response.headers["cache-control"]
+
+        for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            response = client.get(path, params=params, headers={"If-None-Match": if_none_match})
+            assert response.status_code == 304
+            assert response.content == b""
+
+        response = client.get(path, params=params, headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+def test_row_value_lookups():
+    client = TestClient(app.app)
+    file_id = upload_sample(client)
+    row = client.get("/row_value", params={"file_id": file_id, "table_name": "REVENUE", "row_name": "a"})
+    assert row.json() == {"table_name": "REVENUE", "row_name": "a", "value": 3.0,
+                          "sheet": "Sheet", "location": "A2"}
+    row = client.get("/row_value", params={"file_id": file_id, "table_name": "COSTS", "row_name": "x"})
+    assert row.json()["value"] == 1.5
+    missing = client.get("/row_value", params={"file_id": file_id, "table_name": "COSTS", "row_name": "y"})
+    assert (missing.status_code, missing.json()["detail"]) == (404, "Row not found")
+
+def test_partly_evicted_table_reports_file_missing():
+    client = TestClient(app.app)
+    file_id = upload_sample(client)
+    del app.file_store[(file_id, "REVENUE")]
+
+    response = client.get("/get_table_details", params={"file_id": file_id, "table_name": "REVENUE"})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "File not found, please upload it again"
+    # The rest of the file is dropped so a re-upload parses it again
+    assert file_id not in app.file_store
+    assert client.get("/list_tables", params={"file_id": file_id}).status_code == 404
+
+def test_partly_evicted_rows_report_file_missing():
+    client = TestClient(app.app)
+    file_id = upload_sample(client)
+    del app.file_store[(file_id, "COSTS", "rows", app.row_chunk("x", app.row_chunk_count(1)))]
+
+    params = {"file_id": file_id, "table_name": "COSTS", "row_name": "x"}
+    response = client.get("/row_value", params=params)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "File not found, please upload it again"
+    assert file_id not in app.file_store